@@ -1,9 +1,21 @@
-from django.utils.timezone import datetime
+import time
+
+from django.utils import timezone
+
+YEAR_CACHE_TIMEOUT = 60 * 60
+
+_year_cache = {'year': None, 'expires': 0}
 
 
 def year(request):
-    """Добавляет переменную с текущим годом."""
-    date = datetime.today()
+    """Добавляет переменную с текущим годом.
+
+    Год пересчитывается не чаще раза в час.
+    """
+    current_time = time.monotonic()
+    if current_time > _year_cache['expires']:
+        _year_cache['year'] = timezone.now().year
+        _year_cache['expires'] = current_time + YEAR_CACHE_TIMEOUT
     return {
-        'year': date.year
+        'year': _year_cache['year']
     }
@@ -6,9 +6,11 @@ from .models import Follow, Post, Group, Comment
 @admin.register(Post)
 class PostAdmin(admin.ModelAdmin):
     list_display = ('pk', 'text', 'pub_date', 'author', 'group')
+    list_select_related = ('author', 'group')
     list_editable = ('group',)
     search_fields = ('text',)
-    list_filter = ('pub_date',)
+    list_filter = ('pub_date', 'group')
+    date_hierarchy = 'pub_date'
     empty_value_display = '-пусто-'
 
 
@@ -21,7 +23,6 @@ class GroupAdmin (admin.ModelAdmin):
         'description'
     )
     search_fields = ('title', 'description',)
-    list_filter = ('description',)
     empty_value_display = ('-пусто-')
 
 
@@ -34,8 +35,10 @@ class CommentAdmin(admin.ModelAdmin):
         'text',
         'created'
     )
-    search_fields = ('text', 'post', 'author',)
-    list_filter = ('post',)
+    list_select_related = ('post', 'author')
+    search_fields = ('text', 'post__text', 'author__username',)
+    list_filter = ('created',)
+    date_hierarchy = 'created'
     empty_value_display = ('-пусто-')
 
 
@@ -46,6 +49,7 @@ class FollowAdmin(admin.ModelAdmin):
         'author',
         'user'
     )
-    search_fields = ('author', 'user',)
+    list_select_related = ('author', 'user')
+    search_fields = ('author__username', 'user__username',)
     list_filter = ('author',)
     empty_value_display = ('-пусто-')
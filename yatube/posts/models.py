@@ -58,7 +58,12 @@ class Post(models.Model):
     )
 
     class Meta:
-        ordering = ('-pub_date', )
+        ordering = ('-pub_date', '-id')
+        indexes = (
+            models.Index(fields=('-pub_date', '-id')),
+            models.Index(fields=('author', '-pub_date')),
+            models.Index(fields=('group', '-pub_date')),
+        )
         verbose_name = 'Пост'
         verbose_name_plural = 'Посты'
 
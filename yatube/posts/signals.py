@@ -0,0 +1,52 @@
+from django.db.models.signals import post_delete, post_init, post_save
+from django.dispatch import receiver
+
+from .models import Comment, Follow, Group, Post, User
+from .utils import (
+    bump_comments_version, bump_feed_version, reset_author,
+    reset_followed_author_ids
+)
+
+
+@receiver((post_save, post_delete), sender=Post)
+@receiver((post_save, post_delete), sender=Group)
+@receiver((post_save, post_delete), sender=Follow)
+def feed_changed(**kwargs):
+    """Сбрасывает кеш лент при изменении постов, групп или подписок."""
+    bump_feed_version()
+
+
+@receiver((post_save, post_delete), sender=Comment)
+def comment_changed(instance, **kwargs):
+    """Меняет ETag страницы поста при любой правке комментария."""
+    bump_comments_version(instance.post_id)
+
+
+@receiver((post_save, post_delete), sender=Follow)
+def follow_changed(instance, **kwargs):
+    """Сбрасывает кеш подписок пользователя."""
+    reset_followed_author_ids(instance.user_id)
+
+
+@receiver(post_init, sender=User)
+def user_loaded(instance, **kwargs):
+    """Запоминает имя пользователя, с которым объект был получен.
+
+    Отложенное поле не читается, чтобы не делать лишний запрос.
+    """
+    instance._loaded_username = instance.__dict__.get('username')
+
+
+@receiver((post_save, post_delete), sender=User)
+def user_changed(instance, update_fields=None, **kwargs):
+    """Сбрасывает кеш автора при изменении пользователя.
+
+    После переименования сбрасывается и запись по старому имени.
+    Обновление одного last_login при входе ленты не меняет.
+    """
+    reset_author(instance.username)
+    if instance._loaded_username not in (None, instance.username):
+        reset_author(instance._loaded_username)
+    instance._loaded_username = instance.username
+    if update_fields != frozenset(('last_login',)):
+        bump_feed_version()
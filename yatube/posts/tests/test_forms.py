@@ -7,6 +7,8 @@ from django.test import Client, TestCase, override_settings
 from django.contrib.auth import get_user_model
 from django.conf import settings
 from django.core.files.uploadedfile import SimpleUploadedFile
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
 
 from posts.forms import PostForm, Comment
 from posts.models import Post, Group
@@ -74,7 +76,10 @@ class PostFormTests(TestCase):
 
         self.assertRedirects(
             response,
-            reverse('posts:profile', args=(PostFormTests.post.author,))
+            reverse(
+                'posts:profile',
+                args=(PostFormTests.post.author.username,)
+            )
         )
         self.assertEqual(Post.objects.count(), post_count + 1)
         self.assertTrue(
@@ -85,6 +90,24 @@ class PostFormTests(TestCase):
             ).exists()
         )
 
+    def test_post_edit_without_changes(self):
+        """Отправка формы без изменений не обновляет пост."""
+        form_data = {
+            'text': PostFormTests.post.text,
+            'group': self.group.id,
+        }
+
+        with CaptureQueriesContext(connection) as queries:
+            self.authorized_client.post(
+                reverse('posts:post_edit', args=(PostFormTests.post.id,)),
+                data=form_data,
+            )
+
+        self.assertFalse(
+            any(query['sql'].startswith('UPDATE "posts_post"')
+                for query in queries.captured_queries)
+        )
+
     def test_post_edit(self):
         """Валидная форма редактирует пост."""
         post_count = Post.objects.count()
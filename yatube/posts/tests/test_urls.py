@@ -136,6 +136,15 @@ class PostURLTests(TestCase):
 
                 self.assertTemplateUsed(response, template)
 
+    def test_add_comment_get_not_allowed(self):
+        """Проверяет, что комментарий нельзя отправить GET-запросом"""
+        response = self.authorized_client.get(f'{self.post_by_id}comment/')
+
+        self.assertEqual(
+            response.status_code,
+            HTTPStatus.METHOD_NOT_ALLOWED
+        )
+
     def test_not_author_edit_post(self):
         """Проверяет, что не автор поста не может редактировать пост"""
         post_detail = self.post_by_id
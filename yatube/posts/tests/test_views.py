@@ -3,7 +3,7 @@ import tempfile
 from http import HTTPStatus
 
 from django import forms
-from django.urls import reverse
+from django.urls import resolve, reverse
 from django.core.paginator import Page
 from django.test import Client, TestCase, override_settings
 from django.contrib.auth import get_user_model
@@ -11,18 +11,46 @@ from django.conf import settings
 from django.core.cache import cache
 from django.core.files.uploadedfile import SimpleUploadedFile
 
-from posts.models import Follow, Group, Post
+from posts import views
+from posts.models import Comment, Follow, Group, Post
 
 User = get_user_model()
 
 TEMP_MEDIA_ROOT = tempfile.mkdtemp(dir=settings.BASE_DIR)
 
+SMALL_GIF = (
+    b'\x47\x49\x46\x38\x39\x61\x02\x00'
+    b'\x01\x00\x80\x00\x00\x00\x00\x00'
+    b'\xFF\xFF\xFF\x21\xF9\x04\x00\x00'
+    b'\x00\x00\x00\x2C\x00\x00\x00\x00'
+    b'\x02\x00\x01\x00\x00\x02\x02\x0C'
+    b'\x0A\x00\x3B'
+)
+
+
+def get_session_cookie(user):
+    """Логинит пользователя один раз и возвращает куку сессии."""
+    client = Client()
+    client.force_login(user)
+    return client.cookies[settings.SESSION_COOKIE_NAME].value
+
+
+def get_authorized_client(session_cookie):
+    """Возвращает клиента с готовой кукой сессии."""
+    client = Client()
+    client.cookies[settings.SESSION_COOKIE_NAME] = session_cookie
+    return client
+
+
+def get_page_post_ids(response):
+    """Возвращает id постов текущей страницы паджинатора."""
+    return {post.id for post in response.context['page_obj']}
+
 
 @override_settings(MEDIA_ROOT=TEMP_MEDIA_ROOT)
 class PostPagesTests(TestCase):
     @classmethod
-    def setUpClass(cls):
-        super().setUpClass()
+    def setUpTestData(cls):
         cls.user = User.objects.create_user(username='Somebody')
         cls.group = Group.objects.create(
             title='Тестовая группа',
@@ -54,6 +82,7 @@ class PostPagesTests(TestCase):
         )
         cls.profile_follow = 'posts:profile_follow'
         cls.profile_unfollow = 'posts:profile_unfollow'
+        cls.session_cookie = get_session_cookie(cls.user)
 
     @classmethod
     def tearDownClass(cls):
@@ -61,28 +90,29 @@ class PostPagesTests(TestCase):
         super().tearDownClass()
 
     def setUp(self):
-        self.authorized_client = Client()
-        self.authorized_client.force_login(self.user)
-        self.authorized_client_not_follower = Client()
-        self.authorized_client_not_follower.force_login(self.user)
-        cache.clear()
+        self.authorized_client = get_authorized_client(self.session_cookie)
+        self.authorized_client_not_follower = get_authorized_client(
+            self.session_cookie
+        )
 
     def test_pages_uses_correct_template(self):
         """URL-адрес использует соответствующий шаблон."""
-        templates_pages_names = {
-            self.index_page: 'posts/index.html',
-            self.group_posts: 'posts/group_list.html',
-            self.profile: 'posts/profile.html',
-            self.post_detail: 'posts/post_detail.html',
-            self.post_create: 'posts/create_post.html',
-            self.post_edit: 'posts/create_post.html',
+        pages_views = {
+            self.index_page: views.index,
+            self.group_posts: views.group_posts,
+            self.profile: views.profile,
+            self.post_detail: views.post_detail,
+            self.post_create: views.post_create,
+            self.post_edit: views.post_edit,
         }
 
-        for reverse_name, template in templates_pages_names.items():
+        for reverse_name, view in pages_views.items():
             with self.subTest(reverse_name=reverse_name):
-                response = self.authorized_client.get(reverse_name)
-                self.assertTemplateUsed(response, template)
-                self.assertEqual(response.status_code, HTTPStatus.OK)
+                self.assertEqual(resolve(reverse_name).func, view)
+
+        response = self.authorized_client.get(self.post_edit)
+        self.assertTemplateUsed(response, 'posts/create_post.html')
+        self.assertEqual(response.status_code, HTTPStatus.OK)
 
     def test_post_create_show_correct_context(self):
         """Шаблон post_create сформирован с правильным контекстом."""
@@ -107,6 +137,7 @@ class PostPagesTests(TestCase):
         """
         Шаблон index_page сформирован с правильным контекстом
         """
+        cache.clear()
         response = self.authorized_client.get(self.index_page)
         post = response.context['page_obj'][0]
 
@@ -143,6 +174,20 @@ class PostPagesTests(TestCase):
 
         self.checking_context(post)
 
+    def test_post_detail_comments_queries(self):
+        """Комментарии на post_detail не порождают запрос на автора"""
+        for num in range(3):
+            Comment.objects.create(
+                post=self.post,
+                author=User.objects.create(username=f'commentator{num}'),
+                text='Тестовый комментарий',
+            )
+
+        with self.assertNumQueries(4):
+            response = self.client.get(self.post_detail)
+
+        self.assertEqual(len(response.context['comments']), 3)
+
     def checking_context(self, post):
         """Проверка атрибутов поста."""
         self.assertEqual(post.id, self.post.id)
@@ -157,11 +202,12 @@ class PostPagesTests(TestCase):
         на главной странице сайта
         на странице выбранной группы
         """
+        cache.clear()
         response_index = self.authorized_client.get(self.index_page)
         response_group = self.authorized_client.get(self.group_posts)
 
-        self.assertIn(self.post, response_index.context['page_obj'])
-        self.assertIn(self.post, response_group.context['page_obj'])
+        self.assertIn(self.post.id, get_page_post_ids(response_index))
+        self.assertIn(self.post.id, get_page_post_ids(response_group))
 
     def test_post_not_in_other_groups(self):
         """
@@ -184,75 +230,160 @@ class PostPagesTests(TestCase):
             group=group_with_post,
         )
 
-        response_with_post = self.authorized_client.get(
-            reverse(
-                'posts:group_posts',
-                kwargs={'slug': f'{group_with_post.slug}'}
-            )
+        url_with_post = reverse(
+            'posts:group_posts',
+            kwargs={'slug': group_with_post.slug}
         )
-        response_without_post = self.authorized_client.get(
-            reverse(
-                'posts:group_posts',
-                kwargs={'slug': f'{group_without_post.slug}'}
-            )
+        url_without_post = reverse(
+            'posts:group_posts',
+            kwargs={'slug': group_without_post.slug}
         )
-        context_with_post = response_with_post.context['page_obj']
-        context_without_post = response_without_post.context['page_obj']
 
-        self.assertIn(post_test, context_with_post)
-        self.assertNotIn(post_test, context_without_post)
+        response_with_post = self.authorized_client.get(url_with_post)
+        response_without_post = self.authorized_client.get(url_without_post)
+        ids_with_post = get_page_post_ids(response_with_post)
+        ids_without_post = get_page_post_ids(response_without_post)
+
+        self.assertIn(post_test.id, ids_with_post)
+        self.assertNotIn(post_test.id, ids_without_post)
 
     def test_cache_index(self):
         """
         Проверка что на главной странице список записей хранится
-        в кеше и обновляется раз в 20 секунд
+        в кеше до изменения постов
         """
+        cache.clear()
         response_before_cache = self.authorized_client.get(self.index_page)
 
-        post_cached = Post.objects.get(pk=1)
-        post_cached.text = 'Измененный текст'
-        post_cached.save()
+        changed_text = 'Измененный текст'
+        Post.objects.filter(pk=self.post.pk).update(text=changed_text)
+        changed_text_bytes = changed_text.encode()
 
-        response_cached = self.authorized_client.get(self.index_page)
+        with self.assertNumQueries(2):
+            response_cached = self.authorized_client.get(self.index_page)
 
         self.assertEqual(
             response_before_cache.content,
             response_cached.content
         )
-        self.assertNotIn(
-            post_cached.text,
-            response_cached.content.decode()
-        )
+        self.assertNotIn(changed_text_bytes, response_cached.content)
 
         cache.clear()
 
         response_clear_cache = self.authorized_client.get(self.index_page)
 
-        self.assertIn(
-            post_cached.text,
-            response_clear_cache.content.decode()
-        )
+        self.assertIn(changed_text_bytes, response_clear_cache.content)
         self.assertNotEqual(
             response_before_cache.content,
             response_clear_cache.content
         )
 
+    def test_index_cache_reset_by_new_post(self):
+        """Новый пост сразу появляется на закешированной главной"""
+        cache.clear()
+        self.authorized_client.get(self.index_page)
+        new_post = Post.objects.create(
+            author=self.user,
+            text='Свежий пост',
+        )
+
+        response = self.authorized_client.get(self.index_page)
+
+        self.assertIn(new_post.text.encode(), response.content)
+
+    def test_feed_not_modified(self):
+        """Неизменившаяся лента отдается ответом 304"""
+        etag = self.authorized_client.get(self.group_posts)['ETag']
+
+        response = self.authorized_client.get(
+            self.group_posts,
+            HTTP_IF_NONE_MATCH=etag
+        )
+        self.assertEqual(response.status_code, HTTPStatus.NOT_MODIFIED)
+
+        Post.objects.create(
+            author=self.user,
+            text='Новый пост в группе',
+            group=self.group,
+        )
+        response = self.authorized_client.get(
+            self.group_posts,
+            HTTP_IF_NONE_MATCH=etag
+        )
+        self.assertEqual(response.status_code, HTTPStatus.OK)
+
+    def test_post_detail_etag_changes_with_comments(self):
+        """Новый комментарий меняет ETag страницы поста"""
+        etag = self.authorized_client.get(self.post_detail)['ETag']
+
+        Comment.objects.create(
+            post=self.post,
+            author=self.user,
+            text='Тестовый комментарий',
+        )
+        response = self.authorized_client.get(
+            self.post_detail,
+            HTTP_IF_NONE_MATCH=etag
+        )
+
+        self.assertEqual(response.status_code, HTTPStatus.OK)
+
+    def test_post_detail_etag_changes_with_edited_comment(self):
+        """Правка текста комментария меняет ETag страницы поста"""
+        comment = Comment.objects.create(
+            post=self.post,
+            author=self.user,
+            text='Тестовый комментарий',
+        )
+        etag = self.authorized_client.get(self.post_detail)['ETag']
+
+        comment.text = 'Исправленный комментарий'
+        comment.save()
+        response = self.authorized_client.get(
+            self.post_detail,
+            HTTP_IF_NONE_MATCH=etag
+        )
+
+        self.assertEqual(response.status_code, HTTPStatus.OK)
+
+    def test_post_detail_not_cached_after_relogin(self):
+        """После повторного входа страница поста не отдается ответом 304"""
+        user = User.objects.create_user(
+            username='relogin',
+            password='relogin-password'
+        )
+        credentials = {
+            'username': user.username,
+            'password': 'relogin-password',
+        }
+        client = Client()
+        client.post(reverse('users:login'), credentials)
+        etag = client.get(self.post_detail)['ETag']
+
+        client.post(reverse('users:logout'))
+        client.post(reverse('users:login'), credentials)
+        response = client.get(self.post_detail, HTTP_IF_NONE_MATCH=etag)
+
+        self.assertEqual(response.status_code, HTTPStatus.OK)
+
+    def test_post_detail_etag_hides_csrf_token(self):
+        """ETag страницы поста не содержит токен CSRF"""
+        self.authorized_client.get(self.post_detail)
+        csrf_token = self.authorized_client.cookies[
+            settings.CSRF_COOKIE_NAME
+        ].value
+        response = self.authorized_client.get(self.post_detail)
+
+        self.assertNotIn(csrf_token, response['ETag'])
+
     def test_image_in_context(self):
         """
         Шаблоны index, profile, group_list, post_detail сформированы
         с правильным контекстом при выводе поста с картинкой
         """
-        small_gif = (
-            b'\x47\x49\x46\x38\x39\x61\x02\x00'
-            b'\x01\x00\x80\x00\x00\x00\x00\x00'
-            b'\xFF\xFF\xFF\x21\xF9\x04\x00\x00'
-            b'\x00\x00\x00\x2C\x00\x00\x00\x00'
-            b'\x02\x00\x01\x00\x00\x02\x02\x0C'
-            b'\x0A\x00\x3B'
-        )
         uploaded = SimpleUploadedFile(
             name='small.gif',
-            content=small_gif,
+            content=SMALL_GIF,
             content_type='posts/small.gif'
         )
         test_pages = [
@@ -271,36 +402,71 @@ class PostPagesTests(TestCase):
             follow=True
         )
 
+        cache.clear()
         for page in test_pages:
             with self.subTest(page=page):
                 response = self.authorized_client.get(page)
-                context = response.context['page_obj']
-                self.assertEqual(
-                    form_data['image'].open().read(),
-                    context[0].image.read()
-                )
+                image = response.context['page_obj'][0].image
+                self.assertEqual(image.read(), SMALL_GIF)
+                image.close()
 
     def test_user_can_follow(self):
         """
         Авторизованный пользователь может подписываться
         на других пользователей
         """
-        follower = User.objects.create(username='follower')
         following = User.objects.create(username='following')
-        before_follow = Follow.objects.all().count()
-        Follow.objects.create(
-            user=follower,
-            author=following,
+        before_follow = Follow.objects.count()
+        self.authorized_client.get(
+            reverse(self.profile_follow, args=(following.username,))
         )
 
-        self.assertEqual(Follow.objects.all().count(), before_follow + 1)
+        self.assertEqual(Follow.objects.count(), before_follow + 1)
         self.assertTrue(
             Follow.objects.filter(
-                user=follower,
+                user=self.user,
                 author=following,
             ).exists()
         )
 
+    def test_user_follows_author_once(self):
+        """Повторная подписка не создает дубликат"""
+        following = User.objects.create(username='following')
+        follow_url = reverse(self.profile_follow, args=(following.username,))
+
+        self.authorized_client.get(follow_url)
+        self.authorized_client.get(follow_url)
+
+        self.assertEqual(
+            Follow.objects.filter(user=self.user, author=following).count(),
+            1
+        )
+
+    def test_profile_not_found_after_rename(self):
+        """После переименования старый адрес профиля отдает 404"""
+        author = User.objects.create(username='old_name')
+        old_profile = reverse('posts:profile', args=(author.username,))
+        self.assertEqual(
+            self.authorized_client.get(old_profile).status_code,
+            HTTPStatus.OK
+        )
+
+        author.username = 'new_name'
+        author.save()
+
+        self.assertEqual(
+            self.authorized_client.get(old_profile).status_code,
+            HTTPStatus.NOT_FOUND
+        )
+
+    def test_user_save_without_extra_queries(self):
+        """Сохранение пользователя не делает лишний SELECT"""
+        author = User.objects.get(username=self.user.username)
+        author.first_name = 'Новое имя'
+
+        with self.assertNumQueries(1):
+            author.save()
+
     def test_user_can_unfollow(self):
         """
         Авторизованный пользователь может удалять
@@ -311,14 +477,14 @@ class PostPagesTests(TestCase):
         self.authorized_client.get(
             reverse(
                 self.profile_follow,
-                args=(following,))
+                args=(following.username,))
         )
-        before_unfollow = Follow.objects.all().count()
+        before_unfollow = Follow.objects.count()
         self.authorized_client.get(
-            reverse(self.profile_unfollow, args=(following,))
+            reverse(self.profile_unfollow, args=(following.username,))
         )
 
-        self.assertEqual(Follow.objects.all().count(), before_unfollow - 1)
+        self.assertEqual(Follow.objects.count(), before_unfollow - 1)
         self.assertFalse(
             Follow.objects.filter(
                 user=follower,
@@ -345,14 +511,12 @@ class PostPagesTests(TestCase):
             text='Текст с большим количеством букв',
             group=self.group,
         )
-        self.authorized_client.get(
-            reverse(self.profile_follow, kwargs={'username': author})
-        )
+        follow_url = reverse(self.profile_follow, args=(author.username,))
         follower_index_url = reverse('posts:follow_index')
+        self.authorized_client.get(follow_url)
         response = self.authorized_client.get(follower_index_url)
-        objects = response.context['page_obj']
 
-        self.assertIn(post_for_following, objects)
+        self.assertIn(post_for_following.id, get_page_post_ids(response))
 
         response = self.authorized_client_not_follower.get(follower_index_url)
         objects_count = len(response.context['page_obj'])
@@ -363,51 +527,58 @@ class PostPagesTests(TestCase):
 class TestingPaginator(TestCase):
     """Проверка паджинатора и наличия класса Page в контексте шаблона"""
     @classmethod
-    def setUpClass(cls):
-        super().setUpClass()
+    def setUpTestData(cls):
         cls.group = Group.objects.create(
             title='Тестовая группа',
             slug='test-slug',
         )
         cls.POSTS_FOR_PAGINATOR_TESTING = settings.POST_PER_PAGE + 3
         cls.user = User.objects.create_user(username='Somebody')
-        cls.authorized_client = Client()
-        cls.authorized_client.force_login(cls.user)
-        cls.posts_for_test = []
-        for test_num in range(1, cls.POSTS_FOR_PAGINATOR_TESTING):
-            cls.posts_for_test.append(Post(
-                author=cls.user,
-                text=f'Test{test_num}',
-                group=cls.group))
-        Post.objects.bulk_create(cls.posts_for_test)
+        cls.posts_for_test = Post.objects.bulk_create(
+            (
+                Post(
+                    author=cls.user,
+                    text=f'Test{test_num}',
+                    group=cls.group,
+                )
+                for test_num in range(1, cls.POSTS_FOR_PAGINATOR_TESTING)
+            ),
+            batch_size=100,
+        )
+        cls.session_cookie = get_session_cookie(cls.user)
 
     def setUp(self):
-        self.authorized_client = Client()
-        self.authorized_client.force_login(self.user)
-        cache.clear()
+        self.authorized_client = get_authorized_client(self.session_cookie)
 
     def test_pages_contain_ten_records_and_class_page(self):
         """Проверка работы паджинатора и использования
         класса Page в контексте"""
         posts_on_second_page = len(
             self.posts_for_test) - settings.POST_PER_PAGE
+        cache.clear()
 
-        pages = (
-            reverse('posts:index'),
+        # Вторая страница берет автора, количество постов и подписки
+        # из кеша.
+        pages_queries = {
+            reverse('posts:index'): (4, 3),
             reverse(
                 'posts:group_posts',
-                kwargs={'slug': f'{self.group.slug}'}
-            ),
+                kwargs={'slug': self.group.slug}
+            ): (5, 4),
             reverse(
                 'posts:profile',
-                kwargs={'username': f'{self.user.username}'}
-            ),
-        )
+                kwargs={'username': self.user.username}
+            ): (6, 3),
+        }
 
-        for page in pages:
+        for page, (first_queries, second_queries) in pages_queries.items():
             with self.subTest(page=page):
-                first_page = self.authorized_client.get(page)
-                second_page = self.authorized_client.get(page + '?page=2')
+                with self.assertNumQueries(first_queries):
+                    first_page = self.authorized_client.get(page)
+                with self.assertNumQueries(second_queries):
+                    second_page = self.authorized_client.get(
+                        page + '?page=2'
+                    )
                 context_first_page = first_page.context['page_obj']
                 context_second_page = second_page.context['page_obj']
                 self.assertEqual(
@@ -427,3 +598,49 @@ class TestingPaginator(TestCase):
                     Page,
                     f'На станице {page} нет класса Page в контексте'
                 )
+
+    def test_paginator_count_refreshed_after_new_post(self):
+        """Кешированное количество постов сбрасывается новым постом"""
+        cache.clear()
+        second_page = reverse(
+            'posts:group_posts',
+            kwargs={'slug': self.group.slug}
+        ) + '?page=2'
+        posts_on_second_page = len(
+            self.posts_for_test) - settings.POST_PER_PAGE
+
+        self.authorized_client.get(second_page)
+        Post.objects.create(
+            author=self.user,
+            text='Новый пост',
+            group=self.group,
+        )
+        response = self.authorized_client.get(second_page)
+
+        self.assertEqual(
+            len(response.context['page_obj']),
+            posts_on_second_page + 1
+        )
+
+    def test_follow_index_queries(self):
+        """Количество запросов ленты подписок не зависит от числа постов"""
+        cache.clear()
+        follower = User.objects.create(username='follower')
+        Follow.objects.create(user=follower, author=self.user)
+        follower_client = Client()
+        follower_client.force_login(follower)
+        follow_index = reverse('posts:follow_index')
+
+        with self.assertNumQueries(5):
+            first_page = follower_client.get(follow_index)
+        with self.assertNumQueries(3):
+            second_page = follower_client.get(follow_index + '?page=2')
+
+        self.assertEqual(
+            len(first_page.context['page_obj']),
+            settings.POST_PER_PAGE
+        )
+        self.assertEqual(
+            len(second_page.context['page_obj']),
+            len(self.posts_for_test) - settings.POST_PER_PAGE
+        )
@@ -1,8 +1,138 @@
+import hashlib
+import time
+
+from django.core.cache import cache
+from django.core.exceptions import EmptyResultSet
 from django.core.paginator import Paginator
 from django.conf import settings
+from django.db.models import Count, Max
+from django.http import Http404
+from django.utils.crypto import salted_hmac
+from django.utils.functional import cached_property
+
+from .models import Comment, Follow, User
+
+FEED_VERSION_KEY = 'posts:feed_version'
+FOLLOWED_AUTHORS_KEY = 'follows:{user_id}'
+AUTHOR_KEY = 'user:by_username:{username}'
+COMMENTS_VERSION_KEY = 'post:{post_id}:comments_version'
+
+
+def get_feed_version():
+    """Возвращает текущую версию лент постов."""
+    return cache.get_or_set(FEED_VERSION_KEY, time.time_ns, None)
+
+
+def bump_feed_version():
+    """Делает устаревшими все закешированные данные лент."""
+    cache.set(FEED_VERSION_KEY, time.time_ns(), None)
+
+
+def get_feed_etag(request, *args, **kwargs):
+    """ETag страниц с постами: версия лент и текущий пользователь."""
+    return f'{get_feed_version()}-{request.user.pk}'
+
+
+def get_comments_version(post_id):
+    """Возвращает версию комментариев поста."""
+    return cache.get_or_set(
+        COMMENTS_VERSION_KEY.format(post_id=post_id), time.time_ns, None
+    )
+
+
+def bump_comments_version(post_id):
+    """Делает устаревшими ETag страницы поста после правки комментариев."""
+    cache.set(
+        COMMENTS_VERSION_KEY.format(post_id=post_id), time.time_ns(), None
+    )
+
+
+def get_post_etag(request, post_id):
+    """ETag страницы поста с учетом его комментариев.
+
+    Для авторизованного пользователя в ETag входит хеш токена CSRF:
+    после повторного входа страница с формой комментария
+    отдается заново, а не ответом 304 со старым токеном.
+    Сам токен в заголовок не попадает.
+    """
+    comments = Comment.objects.filter(post_id=post_id).aggregate(
+        last_id=Max('id'),
+        total=Count('id'),
+    )
+    csrf_digest = ''
+    if request.user.is_authenticated:
+        csrf_digest = salted_hmac(
+            'posts.post_etag', request.META.get('CSRF_COOKIE', '')
+        ).hexdigest()
+    return '-'.join(map(str, (
+        get_feed_etag(request),
+        csrf_digest,
+        get_comments_version(post_id),
+        comments['last_id'],
+        comments['total'],
+    )))
+
+
+def get_followed_author_ids(user_id):
+    """Возвращает множество id авторов, на которых подписан пользователь."""
+    return cache.get_or_set(
+        FOLLOWED_AUTHORS_KEY.format(user_id=user_id),
+        lambda: set(
+            Follow.objects.filter(
+                user_id=user_id
+            ).values_list('author_id', flat=True)
+        ),
+        settings.FOLLOWS_CACHE_TIMEOUT,
+    )
+
+
+def reset_followed_author_ids(user_id):
+    """Сбрасывает закешированные подписки пользователя."""
+    cache.delete(FOLLOWED_AUTHORS_KEY.format(user_id=user_id))
+
+
+def get_author_by_username(username):
+    """Возвращает автора по имени пользователя или 404."""
+    try:
+        return cache.get_or_set(
+            AUTHOR_KEY.format(username=username),
+            lambda: User.objects.only(
+                'id', 'username', 'first_name', 'last_name'
+            ).get(username=username),
+            settings.AUTHOR_CACHE_TIMEOUT,
+        )
+    except User.DoesNotExist:
+        raise Http404('Пользователь не найден')
+
+
+def reset_author(username):
+    """Сбрасывает закешированного автора."""
+    cache.delete(AUTHOR_KEY.format(username=username))
+
+
+class CachedCountPaginator(Paginator):
+    """Паджинатор, который берет количество объектов из кеша.
+
+    Значение живет до следующего изменения постов или подписок,
+    поэтому SELECT COUNT(*) выполняется только после записи.
+    """
+
+    @cached_property
+    def count(self):
+        try:
+            sql = str(self.object_list.query)
+        except EmptyResultSet:
+            return super().count
+        query_hash = hashlib.md5(sql.encode()).hexdigest()
+        key = f'paginator:count:{get_feed_version()}:{query_hash}'
+        count = cache.get(key)
+        if count is None:
+            count = super().count
+            cache.set(key, count, settings.PAGINATOR_COUNT_TIMEOUT)
+        return count
 
 
 def paginate_objects(posts, request):
     page_number = request.GET.get('page')
-    paginator = Paginator(posts, settings.POST_PER_PAGE)
+    paginator = CachedCountPaginator(posts, settings.POST_PER_PAGE)
     return paginator.get_page(page_number)
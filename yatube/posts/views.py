@@ -1,25 +1,45 @@
 from django.shortcuts import render, get_object_or_404, redirect
 from django.contrib.auth.decorators import login_required
-from django.views.decorators.cache import cache_page
+from django.db.models import Prefetch
+from django.views.decorators.http import (
+    condition, require_http_methods, require_POST
+)
 
 from .forms import PostForm, CommentForm
-from .models import Post, Group, User, Follow
-from .utils import paginate_objects
-
-
-@cache_page(20, key_prefix='index_page')
+from .models import Comment, Follow, Group, Post
+from .utils import (
+    get_author_by_username,
+    get_feed_etag,
+    get_feed_version,
+    get_followed_author_ids,
+    get_post_etag,
+    paginate_objects,
+)
+
+POST_FIELDS = ('id', 'text', 'pub_date', 'image', 'author', 'group')
+AUTHOR_FIELDS = ('author__username', 'author__first_name', 'author__last_name')
+GROUP_FIELDS = ('group__slug',)
+
+
+@condition(etag_func=get_feed_etag)
 def index(request):
-    posts = Post.objects.all()
+    posts = Post.objects.select_related('author', 'group').only(
+        *POST_FIELDS, *AUTHOR_FIELDS, *GROUP_FIELDS
+    )
     page_obj = paginate_objects(posts, request)
     context = {
         'page_obj': page_obj,
+        'feed_version': get_feed_version(),
     }
     return render(request, 'posts/index.html', context)
 
 
+@condition(etag_func=get_feed_etag)
 def group_posts(request, slug):
     group = get_object_or_404(Group, slug=slug)
-    posts = group.posts.all()
+    posts = group.posts.select_related('author').only(
+        *POST_FIELDS, *AUTHOR_FIELDS
+    )
     page_obj = paginate_objects(posts, request)
     context = {
         'group': group,
@@ -28,32 +48,36 @@ def group_posts(request, slug):
     return render(request, 'posts/group_list.html', context)
 
 
+@condition(etag_func=get_feed_etag)
 def profile(request, username):
-    current_user = request.user
-    author = get_object_or_404(User, username=username)
-    post_list = author.posts.all()
+    author = get_author_by_username(username)
+    post_list = author.posts.select_related('group').only(
+        *POST_FIELDS, *GROUP_FIELDS
+    )
     page_obj = paginate_objects(post_list, request)
-    if current_user.is_authenticated:
-        following_query = Follow.objects.filter(
-            author=author,
-            user=current_user
-        )
-        following = following_query.exists()
-        context = {
-            'page_obj': page_obj,
-            'author': author,
-            'following': following,
-        }
-        return render(request, 'posts/profile.html', context)
+    following = (
+        request.user.is_authenticated
+        and author.pk in get_followed_author_ids(request.user.pk)
+    )
     context = {
         'page_obj': page_obj,
         'author': author,
+        'following': following,
     }
     return render(request, 'posts/profile.html', context)
 
 
+@condition(etag_func=get_post_etag)
 def post_detail(request, post_id):
-    post = get_object_or_404(Post, pk=post_id)
+    post = get_object_or_404(
+        Post.objects.select_related('author', 'group').prefetch_related(
+            Prefetch(
+                'comments',
+                queryset=Comment.objects.select_related('author')
+            )
+        ),
+        pk=post_id
+    )
     form = CommentForm()
     comments = post.comments.all()
     context = {
@@ -65,12 +89,12 @@ def post_detail(request, post_id):
 
 
 @login_required
+@require_http_methods(['GET', 'POST'])
 def post_create(request):
-    form = PostForm(
-        request.POST or None,
-        files=request.FILES or None
-    )
-    if request.method == "POST":
+    if request.method == 'GET':
+        form = PostForm()
+    else:
+        form = PostForm(request.POST, files=request.FILES)
         if form.is_valid():
             post = form.save(commit=False)
             post.author = request.user
@@ -84,17 +108,17 @@ def post_create(request):
 
 @login_required
 def post_edit(request, post_id: int):
-    current_user = request.user
     post = get_object_or_404(Post, pk=post_id)
+    if post.author_id != request.user.pk:
+        return redirect('posts:post_detail', post_id=post_id)
     form = PostForm(
         request.POST or None,
         files=request.FILES or None,
         instance=post
     )
-    if current_user != post.author:
-        return redirect('posts:post_detail', post_id=post_id)
     if request.method == 'POST' and form.is_valid():
-        form.save()
+        if form.has_changed():
+            form.save(commit=False).save(update_fields=form.changed_data)
         return redirect('posts:post_detail', post_id=post_id)
     context = {
         'is_edit': True,
@@ -105,23 +129,26 @@ def post_edit(request, post_id: int):
 
 
 @login_required
+@require_POST
 def add_comment(request, post_id):
-    post = get_object_or_404(Post, id=post_id)
-    form = CommentForm(request.POST or None)
-    if request.method == 'POST':
-        if form.is_valid():
-            comment = form.save(commit=False)
-            comment.author = request.user
-            comment.post = post
-            comment.save()
+    post = get_object_or_404(Post.objects.only('id'), id=post_id)
+    form = CommentForm(request.POST)
+    if form.is_valid():
+        comment = form.save(commit=False)
+        comment.author = request.user
+        comment.post = post
+        comment.save()
     return redirect('posts:post_detail', post_id=post_id)
 
 
 @login_required
+@condition(etag_func=get_feed_etag)
 def follow_index(request):
-    current_user = request.user
     post_list = Post.objects.filter(
-        author__following__user=current_user)
+        author_id__in=get_followed_author_ids(request.user.pk)
+    ).select_related('author', 'group').only(
+        *POST_FIELDS, *AUTHOR_FIELDS, *GROUP_FIELDS
+    )
     page_obj = paginate_objects(post_list, request)
     context = {
         'page_obj': page_obj,
@@ -131,25 +158,18 @@ def follow_index(request):
 
 @login_required
 def profile_follow(request, username):
-    current_user = request.user
-    author = get_object_or_404(User, username=username)
-    following_query = Follow.objects.filter(
-        author=author,
-        user=current_user
-    )
-    if author != current_user and not following_query.exists():
-        Follow.objects.create(user=current_user, author=author)
+    user_id = request.user.pk
+    author = get_author_by_username(username)
+    if author.pk != user_id:
+        Follow.objects.get_or_create(user_id=user_id, author_id=author.pk)
     return redirect('posts:follow_index')
 
 
 @login_required
 def profile_unfollow(request, username):
-    current_user = request.user
-    author = get_object_or_404(User, username=username)
-    following_query = Follow.objects.filter(
-        author=author,
-        user=current_user
-    )
-    if following_query.exists():
-        following_query.delete()
+    author = get_author_by_username(username)
+    Follow.objects.filter(
+        user_id=request.user.pk,
+        author_id=author.pk
+    ).delete()
     return redirect('posts:index')
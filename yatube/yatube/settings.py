@@ -16,7 +16,7 @@ ALLOWED_HOSTS = [
 
 INSTALLED_APPS = [
     'about',
-    'posts',
+    'posts.apps.PostsConfig',
     'users',
     'core.apps.CoreConfig',
     'django.contrib.admin',
@@ -50,6 +50,9 @@ DATABASES = {
     'default': {
         'ENGINE': 'django.db.backends.sqlite3',
         'NAME': os.path.join(BASE_DIR, 'db.sqlite3'),
+        'TEST': {
+            'NAME': ':memory:',
+        },
     }
 }
 
@@ -107,6 +110,9 @@ EMAIL_BACKEND = 'django.core.mail.backends.filebased.EmailBackend'
 EMAIL_FILE_PATH = os.path.join(BASE_DIR, 'sent_emails')
 
 POST_PER_PAGE = 10
+PAGINATOR_COUNT_TIMEOUT = 60 * 60
+FOLLOWS_CACHE_TIMEOUT = 60 * 60
+AUTHOR_CACHE_TIMEOUT = 60 * 5
 
 MEDIA_URL = '/media/'
 MEDIA_ROOT = os.path.join(BASE_DIR, 'media')
@@ -115,7 +121,8 @@ CSRF_FAILURE_VIEW = 'core.views.csrf_failure'
 
 CACHES = {
     'default': {
-        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+        'LOCATION': os.path.join(BASE_DIR, 'cache'),
     }
 }
 